@@ -6,7 +6,7 @@ from pathlib import Path
 
 from miniscope_io.io import SDCard
 from miniscope_io.logging import init_logger
-from miniscope_io.models.config import Config
+from miniscope_io.models.config import Config, get_config
 
 BASE_DIR = Path(__file__).parent.resolve()
 DATA_DIR = BASE_DIR / "data"
@@ -19,5 +19,6 @@ __all__ = [
     "CONFIG_DIR",
     "Config",
     "SDCard",
+    "get_config",
     "init_logger",
 ]
@@ -2,10 +2,13 @@
 Bit operations for parsing header and payload information. Currently for use in streamDaq module.
 """
 
-from typing import Tuple
+from typing import List, Optional, Tuple
 
 import numpy as np
 
+_BIT_REVERSE_LUT = np.array([int(f"{i:08b}"[::-1], 2) for i in range(256)], dtype=np.uint8)
+"""Each byte value with its bit order reversed, indexed by the byte value"""
+
 
 class BufferFormatter:
     """
@@ -35,8 +38,9 @@ class BufferFormatter:
         >>> _reverse_bits_in_array(np.array([0b00000000000001111000000000000111], dtype=np.uint32))
         array([3758219264], dtype=uint32) #0b11100000000000011110000000000000 in binary format
         """
-        arr = np.unpackbits(arr.view(np.uint8)).reshape(-1, 32)[:, ::-1]
-        return np.packbits(arr).view(np.uint32)
+        # reversing the bits of a word = reversing the bits of each byte + the byte order
+        arr = _BIT_REVERSE_LUT.take(arr.view(np.uint8)).reshape(-1, 4)[:, ::-1]
+        return np.ascontiguousarray(arr).view(np.uint32).ravel()
 
     @staticmethod
     def _reverse_byte_order_in_array(arr: np.ndarray) -> np.ndarray:
@@ -63,6 +67,22 @@ class BufferFormatter:
         """
         return arr.byteswap()
 
+    @classmethod
+    def _reverse_array(cls, arr: np.ndarray, reverse_bits: bool, reverse_bytes: bool) -> np.ndarray:
+        """
+        Optionally reverse the bit and/or byte order of each 32-bit element in a numpy array.
+
+        Reversing both is the same as reversing the bits within each byte,
+        so that is done in a single lookup rather than two passes.
+        """
+        if reverse_bits and reverse_bytes:
+            return _BIT_REVERSE_LUT.take(arr.view(np.uint8)).view(np.uint32)
+        if reverse_bits:
+            return cls._reverse_bits_in_array(arr)
+        if reverse_bytes:
+            return cls._reverse_byte_order_in_array(arr)
+        return arr
+
     @classmethod
     def bytebuffer_to_ndarrays(
         cls,
@@ -137,19 +157,146 @@ class BufferFormatter:
         data = np.frombuffer(padded_buffer, dtype=np.uint32)
 
         # Process header
-        header = data[preamble_length_words:header_length_words]
-        if reverse_header_bits:
-            header = cls._reverse_bits_in_array(header)
-        if reverse_header_bytes:
-            header = cls._reverse_byte_order_in_array(header)
+        header = cls._reverse_array(
+            data[preamble_length_words:header_length_words],
+            reverse_header_bits,
+            reverse_header_bytes,
+        )
 
         # Process body
-        payload_data = data[header_length_words:]
-        if reverse_payload_bits:
-            payload_data = cls._reverse_bits_in_array(payload_data)
-        if reverse_payload_bytes:
-            payload_data = cls._reverse_byte_order_in_array(payload_data)
+        payload_data = cls._reverse_array(
+            data[header_length_words:], reverse_payload_bits, reverse_payload_bytes
+        )
 
         # Convert processed body buffer to uint8 numpy array
         payload_uint8 = payload_data.view(np.uint8)
         return header, payload_uint8
+
+
+class PreambleScanner:
+    """
+    Split a byte stream into buffers that each begin with a preamble.
+
+    The stream from the DAQ is not byte-aligned, so the preamble can start at any bit.
+    Rather than walking the stream one bit at a time, the stream is shifted by each of
+    the 8 possible bit offsets and the preamble is searched for in each shifted copy
+    with :meth:`bytes.find` . Each chunk of the stream is only searched once,
+    rather than searching everything since the last preamble again.
+    Buffers are returned as bytes starting at their first bit,
+    with any bits past the end of the buffer in the last byte zeroed.
+
+    Parameters
+    ----------
+    preamble : bytes
+        The preamble to search for, in the bit order it appears in the stream.
+
+    Examples
+    --------
+    >>> scanner = PreambleScanner(b"\\x12\\x34\\x56\\x78")
+    >>> scanner.feed(b"\\x00\\x12\\x34\\x56\\x78\\xff\\x12\\x34\\x56\\x78")
+    [b'\\x124Vx\\xff']
+    """
+
+    def __init__(self, preamble: bytes):
+        self.preamble = bytes(preamble)
+        self._buffer = bytearray()
+        self._start_bit: Optional[int] = None
+        """Bit position of the preamble the buffer starts with, once one has been found"""
+        self._searched = 0
+        """Number of bytes at the start of the buffer that have already been searched"""
+
+    @staticmethod
+    def _shift_left(arr: np.ndarray, shift: int) -> bytes:
+        """
+        Shift a uint8 array left by ``shift`` bits (0-7), dropping the incomplete last byte.
+        """
+        if shift == 0:
+            return arr.tobytes()
+        return ((arr[:-1] << shift) | (arr[1:] >> (8 - shift))).tobytes()
+
+    @staticmethod
+    def _extract(arr: np.ndarray, buf_start: int, n_bits: int) -> bytes:
+        """
+        Copy ``n_bits`` bits starting at bit ``buf_start`` out of a uint8 array
+        into byte-aligned bytes, zeroing any bits past the end in the last byte.
+
+        The shift and mask are done in a single output array,
+        so the only copy besides it is the final conversion to bytes.
+        """
+        byte_start, shift = divmod(buf_start, 8)
+        n_bytes = (n_bits + 7) // 8
+        chunk = arr[byte_start : byte_start + n_bytes + 1]
+        if shift == 0:
+            out = chunk[:n_bytes].copy()
+        else:
+            if len(chunk) <= n_bytes:
+                # the buffer ends in the last byte received, which has nothing after it to
+                # shift in - pad it rather than dropping the buffer's last byte
+                chunk = np.append(chunk, np.zeros(n_bytes + 1 - len(chunk), dtype=np.uint8))
+            out = chunk[:n_bytes] << shift
+            out |= chunk[1 : n_bytes + 1] >> (8 - shift)
+        if n_bits % 8 and len(out):
+            out[-1] &= (0xFF << (8 - n_bits % 8)) & 0xFF
+        return out.tobytes()
+
+    def _find(self, arr: np.ndarray) -> List[int]:
+        """
+        Find the bit positions of the preamble in the part of the buffer not yet searched.
+        """
+        # back up far enough to catch a preamble that was cut off by the end of the last chunk
+        search_start = max(self._searched - len(self.preamble), 0)
+        self._searched = len(arr)
+
+        positions = []
+        for shift in range(8):
+            stream = self._shift_left(arr[search_start:], shift)
+            idx = stream.find(self.preamble)
+            while idx != -1:
+                positions.append((search_start + idx) * 8 + shift)
+                idx = stream.find(self.preamble, idx + 1)
+        return positions
+
+    def feed(self, data: bytes, offset: int = 0) -> List[bytes]:
+        """
+        Add data to the stream and return the buffers that were completed by it.
+
+        A buffer is complete once the preamble of the following buffer has been found,
+        the data from the last preamble onwards is kept until the next call.
+
+        Parameters
+        ----------
+        data : bytes
+            The next chunk of the stream.
+        offset : int, optional
+            Number of bits to shift the start and end of each buffer by, by default 0.
+
+        Returns
+        -------
+        list[bytes]
+            The completed buffers, in stream order.
+        """
+        self._buffer.extend(data)
+        arr = np.frombuffer(self._buffer, dtype=np.uint8)
+
+        positions = self._find(arr)
+        if self._start_bit is not None:
+            # the preamble we start with may be found again in the overlap with the last chunk
+            positions = [p for p in positions if p > self._start_bit]
+            positions.insert(0, self._start_bit)
+        positions.sort()
+
+        buffers = [
+            self._extract(arr, buf_start + offset, buf_stop - buf_start)
+            for buf_start, buf_stop in zip(positions[:-1], positions[1:])
+        ]
+        del arr  # release the export so the buffer can be resized below
+
+        if positions:
+            trim = positions[-1] // 8
+            self._start_bit = positions[-1] - trim * 8
+        else:
+            # nothing before the first preamble is used, keep just enough to find it
+            trim = max(len(self._buffer) - len(self.preamble), 0)
+        del self._buffer[:trim]
+        self._searched -= trim
+        return buffers
@@ -5,8 +5,13 @@ I/O functions for SD card and external files.
 import atexit
 import contextlib
 import csv
+import mmap
+import queue
+import threading
+from fractions import Fraction
+from functools import cache
 from pathlib import Path
-from typing import Any, BinaryIO, List, Literal, Optional, Union, overload
+from typing import Any, BinaryIO, Literal, Optional, Sequence, Tuple, Union, overload
 
 import cv2
 import numpy as np
@@ -48,13 +53,13 @@ class BufferedCSVWriter:
         # Ensure the buffer is flushed when the program exits
         atexit.register(self.flush_buffer)
 
-    def append(self, data: List[Any]) -> None:
+    def append(self, data: Sequence[Any]) -> None:
         """
-        Append data (as a list) to the buffer.
+        Append data (as a list or tuple) to the buffer.
 
         Parameters
         ----------
-        data : List[Any]
+        data : Sequence[Any]
             The data to be appended.
         """
         data = [int(value) if isinstance(value, np.generic) else value for value in data]
@@ -90,6 +95,159 @@ class BufferedCSVWriter:
         self.close()
 
 
+class ThreadedVideoWriter:
+    """
+    Write frames to a :class:`cv2.VideoWriter` from a background thread,
+    so that encoding and disk I/O don't hold up the caller.
+
+    Has the same ``write`` / ``release`` interface as :class:`cv2.VideoWriter` .
+
+    Parameters
+    ----------
+    writer : :class:`cv2.VideoWriter`
+        The writer to write frames with. Released by :meth:`.release` .
+    is_color : bool, optional
+        Whether ``writer`` was opened with ``isColor=True`` , in which case
+        grayscale frames are converted to BGR before writing (default is False).
+    queue_size : int, optional
+        Number of frames that can be waiting to be written before :meth:`.write` blocks
+        (default is 8).
+    """
+
+    _STOP = object()
+    """Put in the queue to stop the writer thread"""
+
+    def __init__(self, writer: cv2.VideoWriter, is_color: bool = False, queue_size: int = 8):
+        self.writer = writer
+        self.is_color = is_color
+        self.logger = init_logger("ThreadedVideoWriter")
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._write_frames, name="video_writer")
+        self._thread.start()
+
+    def _write_frames(self) -> None:
+        # compare with `is`, `iter(get, sentinel)` compares with `==` which fails for arrays
+        while (frame := self._queue.get()) is not self._STOP:
+            try:
+                if self.is_color and frame.ndim == 2:
+                    frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+                self.writer.write(frame)
+            except Exception as e:
+                self.logger.exception(f"Failed to write video frame: {e}")
+
+    def write(self, frame: np.ndarray) -> None:
+        """
+        Queue a frame to be written.
+
+        The frame must not be modified afterwards, since it is written later.
+        """
+        self._queue.put(frame)
+
+    def release(self) -> None:
+        """
+        Write any queued frames and release the underlying writer.
+        """
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+        self.writer.release()
+
+
+@cache
+def encoder_available(encoder: str) -> bool:
+    """
+    Check whether an FFmpeg encoder can be used with :class:`.PyAVVideoWriter` .
+
+    PyAV wheels include encoders like ``h264_nvenc`` even on machines without the
+    hardware they need, so rather than just looking the encoder up,
+    a small codec context is opened with it. The result is cached for each encoder.
+
+    Args:
+        encoder (str): Name of the FFmpeg encoder
+
+    Returns:
+        bool: ``True`` if the encoder can be opened, ``False`` if not
+        or if PyAV is not installed.
+    """
+    try:
+        import av
+    except ImportError:
+        return False
+
+    try:
+        ctx = av.CodecContext.create(encoder, "w")
+        ctx.width, ctx.height = 64, 64
+        ctx.pix_fmt = "yuv420p"
+        ctx.time_base = Fraction(1, 30)
+        ctx.open()
+    except (av.error.FFmpegError, ValueError):
+        return False
+    return True
+
+
+class PyAVVideoWriter:
+    """
+    Write frames with an FFmpeg encoder through `PyAV <https://pyav.org>`_ ,
+    eg. to use a hardware encoder like ``h264_nvenc`` that opencv doesn't expose.
+
+    Has the same ``write`` / ``release`` interface as :class:`cv2.VideoWriter` .
+    PyAV is not a required dependency of miniscope-io,
+    install it with the ``miniscope-io[video]`` extra.
+
+    Parameters
+    ----------
+    path : Union[str, Path]
+        Output video path
+    encoder : str
+        Name of the FFmpeg encoder, eg. ``h264_nvenc`` , ``libx264``
+    fps : int
+        Frame rate
+    frame_size : tuple[int, int]
+        ``(width, height)`` of the video
+    options : dict, optional
+        Encoder options, eg. ``{"preset": "p4"}``
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        encoder: str,
+        fps: int,
+        frame_size: Tuple[int, int],
+        options: Optional[dict] = None,
+    ):
+        try:
+            import av
+        except ImportError as e:
+            raise ImportError(
+                "PyAV is not a required dependency of miniscope-io, "
+                "install it with the miniscope-io[video] extra or manually in your environment :)"
+            ) from e
+
+        self._av = av
+        self.container = av.open(str(path), mode="w")
+        self.stream = self.container.add_stream(encoder, rate=fps)
+        self.stream.width, self.stream.height = frame_size
+        self.stream.pix_fmt = "yuv420p"
+        if options:
+            self.stream.options = options
+
+    def write(self, frame: np.ndarray) -> None:
+        """
+        Encode a grayscale (2D) or BGR (3D) frame.
+        """
+        fmt = "gray" if frame.ndim == 2 else "bgr24"
+        video_frame = self._av.VideoFrame.from_ndarray(frame, format=fmt)
+        self.container.mux(self.stream.encode(video_frame))
+
+    def release(self) -> None:
+        """
+        Flush the encoder and close the file.
+        """
+        self.container.mux(self.stream.encode())
+        self.container.close()
+
+
 class SDCard:
     """
     I/O for data on an SDCard
@@ -109,15 +267,32 @@ class SDCard:
         self.layout = layout
         self.logger = init_logger("SDCard")
 
+        # sizes used to compute the read size of every buffer
+        self._sector_size = layout.sectors.size
+        self._word_size = layout.word_size
+
+        # header fields and the word they are found in, taken out of the layout once
+        header_fields = {k: v for k, v in layout.buffer.model_dump().items() if v is not None}
+        self._header_names = tuple(header_fields.keys())
+        self._header_index = np.array(list(header_fields.values()), dtype=np.intp)
+
         # Private attributes used when the file reading context is entered
         self._config = None  # type: Optional[SDConfig]
         self._f = None  # type: Optional[BinaryIO]
+        self._file = None  # type: Optional[BinaryIO]
+        """
+        The opened file, when ``_f`` is a memory map of it
+        """
         self._frame = None  # type: Optional[int]
         self._frame_count = None  # type: Optional[int]
         self._array = None  # type: Optional[np.ndarray]
         """
         n_pix x 1 array used to store pixels while reading buffers
         """
+        self._scratch = bytearray()
+        """
+        Reused across buffers to read their data into, grown as needed
+        """
         self.positions = {}
         """
         A mapping between frame number and byte position in the video that makes for 
@@ -266,6 +441,14 @@ class SDCard:
         self._frame = 0
 
         self._f = open(self.drive, "rb")  # noqa: SIM115 - this is a context handler
+        # memory map the file if we can, so buffers are read without a syscall or a copy.
+        # not possible for eg. a block device, so keep reading the file in that case
+        try:
+            mapped = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            pass
+        else:
+            self._file, self._f = self._f, mapped
         # seek to the start of the data
         self._f.seek(self.layout.sectors.data_pos, 0)
         # store the 0th frame position
@@ -274,8 +457,13 @@ class SDCard:
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):  # noqa: ANN001
-        self._f.close()
+        # if a frame still references the map, it is closed when that is garbage collected
+        with contextlib.suppress(BufferError):
+            self._f.close()
         self._f = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
         self._frame = 0
 
     # --------------------------------------------------
@@ -291,19 +479,23 @@ class SDCard:
         # that sort of breaks the abstraction
         # (it assumes the buffer length is always at position 0)
         # but we'll roll with it for now
-        dataHeader = np.frombuffer(sd.read(self.layout.word_size), dtype=np.uint32)
-        dataHeader = np.append(
-            dataHeader,
-            np.frombuffer(
-                sd.read((dataHeader[self.layout.buffer.length] - 1) * self.layout.word_size),
-                dtype=np.uint32,
-            ),
-        )
-
+        first_word = sd.read(self.layout.word_size)
+        dataHeader = np.frombuffer(first_word, dtype=np.uint32)
+        # a memory map reads to the end for a negative size rather than raising like a file,
+        # so check it here (blank data after the recording has a header length of 0)
+        rest_size = (int(dataHeader[self.layout.buffer.length]) - 1) * self.layout.word_size
+        if rest_size < 0:
+            raise ValueError("read length must be non-negative")
+        dataHeader = np.frombuffer(first_word + sd.read(rest_size), dtype=np.uint32)
+
+        # same as SDBufferHeader.from_format(dataHeader, self.layout.buffer, construct=True),
+        # but pulls every field out of the header in one indexing operation.
         # use construct because we're already sure these are ints from the numpy casting
         # https://docs.pydantic.dev/latest/usage/models/#creating-models-without-validation
         try:
-            header = SDBufferHeader.from_format(dataHeader, self.layout.buffer, construct=True)
+            header = SDBufferHeader.model_construct(
+                **dict(zip(self._header_names, dataHeader[self._header_index].tolist()))
+            )
         except IndexError as e:
             raise ReadHeaderException(
                 "Could not read header, expected header to have "
@@ -321,14 +513,10 @@ class SDCard:
 
         Not sure how this works!
         """
-        n_blocks = int(
-            (
-                header.data_length
-                + (header.length * self.layout.word_size)
-                + (self.layout.sectors.size - 1)
-            )
-            / self.layout.sectors.size
-        )
+        # integer ceiling division by the sector size
+        n_blocks = (
+            header.data_length + header.length * self._word_size + self._sector_size - 1
+        ) // self._sector_size
         return n_blocks
 
     def _read_size(self, header: SDBufferHeader) -> int:
@@ -339,7 +527,7 @@ class SDCard:
         them separate in case they are separable actions for now
         """
         n_blocks = self._n_frame_blocks(header)
-        read_size = (n_blocks * self.layout.sectors.size) - (header.length * self.layout.word_size)
+        read_size = (n_blocks * self._sector_size) - (header.length * self._word_size)
         return read_size
 
     def _read_buffer(self, sd: BinaryIO, header: SDBufferHeader) -> np.ndarray:
@@ -348,13 +536,31 @@ class SDCard:
 
         Each frame has several buffers, so for a given frame we read them until we
         get another that's zero!
+
+        The returned array is a view of the memory-mapped file, or of a scratch buffer
+        that is reused by the next read, so it should be copied out before then.
         """
-        data = np.frombuffer(sd.read(self._read_size(header)), dtype=np.uint8)
+        read_size = self._read_size(header)
+        if isinstance(sd, mmap.mmap):
+            position = sd.tell()
+            data = np.frombuffer(
+                sd, dtype=np.uint8, count=min(read_size, len(sd) - position), offset=position
+            )
+            sd.seek(position + data.shape[0])
+            return data
+
+        if len(self._scratch) < read_size:
+            self._scratch = bytearray(read_size)
+        n_read = sd.readinto(memoryview(self._scratch)[:read_size])
+        data = np.frombuffer(self._scratch, dtype=np.uint8, count=n_read)
         return data
 
     def _trim(self, data: np.ndarray, expected_size: int) -> np.ndarray:
         """
-        Trim or pad an array to match an expected size
+        Trim an array to at most an expected size
+
+        Shorter arrays are returned as-is: :meth:`.read` writes them into the
+        frame array, which is zeroed before each frame, so they are padded without a copy.
         """
         if data.shape[0] != expected_size:
             self.logger.warning(
@@ -367,9 +573,6 @@ class SDCard:
             # trim if too long
             if data.shape[0] > expected_size:
                 data = data[0:expected_size]
-            # pad if too short
-            else:
-                data = np.pad(data, (0, expected_size - data.shape[0]))
 
         return data
 
@@ -447,7 +650,10 @@ class SDCard:
             headers.append(header)
             data = self._read_buffer(self._f, header)
             data = self._trim(data, header.data_length)
-            self._array[pixel_count : pixel_count + header.data_length, 0] = data
+            # short buffers are zero-padded by the rest of their slot in the frame array
+            self._array[pixel_count : pixel_count + data.shape[0], 0] = data
+            # don't hold a view of the file map longer than needed
+            del data
             pixel_count += header.data_length
             last_buffer_n = header.frame_buffer_count
 
@@ -462,9 +668,12 @@ class SDCard:
         isColor: bool = False,
         force: bool = False,
         progress: bool = True,
+        encoder: Optional[str] = None,
+        encoder_options: Optional[dict] = None,
     ) -> None:
         """
-        Save contents of SD card to video with opencv
+        Save contents of SD card to video with opencv,
+        or with an FFmpeg encoder through PyAV if ``encoder`` is given
 
         Args:
             path (:class:`pathlib.Path`): Output video path, with video extension
@@ -482,6 +691,14 @@ class SDCard:
             force (bool): If `True`, overwrite output video if one already exists
                 (default: `False`)
             progress (bool): If `True` (default) show progress bar.
+            encoder (str): If present, the name of an FFmpeg encoder to use with
+                :class:`.PyAVVideoWriter` instead of opencv, eg. ``h264_nvenc``
+                to encode on an NVIDIA GPU. ``fourcc`` and ``isColor`` are ignored.
+                If the encoder can't be opened (see :func:`.encoder_available` ),
+                a warning is logged and the video is written with opencv.
+                (default: `None`)
+            encoder_options (dict): Options passed to the FFmpeg encoder
+                when ``encoder`` is given (default: `None`)
         """
         path = Path(path)
         if path.exists() and not force:
@@ -489,6 +706,23 @@ class SDCard:
                 f"{str(path)} already exists, not overwriting. " "Use force=True to overwrite."
             )
 
+        if encoder is not None:
+            if encoder_available(encoder):
+                writer = PyAVVideoWriter(
+                    path,
+                    encoder,
+                    self.config.fs,
+                    (self.config.width, self.config.height),
+                    options=encoder_options,
+                )
+                self._write_video(writer, progress)
+                return
+
+            self.logger.warning(
+                f"Can't open the {encoder} encoder (PyAV isn't installed, "
+                "or the hardware it needs is missing). Writing with opencv instead"
+            )
+
         if path.suffix == ".mp4" and fourcc.lower() == "grey":
             self.logger.warning("Cannot use .mp4 with GREY fourcc code. Using .avi instead")
             path = path.with_suffix(".avi")
@@ -496,9 +730,6 @@ class SDCard:
             self.logger.warning("Cannot use .avi with mp4v fourcc code, using .mp4 instead")
             path = path.with_suffix(".mp4")
 
-        if progress:
-            pbar = tqdm(total=self.frame_count)
-
         writer = cv2.VideoWriter(
             str(path),
             cv2.VideoWriter_fourcc(*fourcc),
@@ -506,6 +737,14 @@ class SDCard:
             (self.config.width, self.config.height),
             isColor=isColor,
         )
+        self._write_video(writer, progress)
+
+    def _write_video(self, writer: Union[cv2.VideoWriter, PyAVVideoWriter], progress: bool) -> None:
+        """
+        Write every frame with a video writer, then release it.
+        """
+        if progress:
+            pbar = tqdm(total=self.frame_count)
 
         # wrap in try block so we always close video writer class
         try:
@@ -632,7 +871,11 @@ class SDCard:
         while True:
             # jump ahead according to the last header we read
             read_size = self._read_size(header)
-            self._f.seek(read_size, 1)
+            if isinstance(self._f, mmap.mmap):
+                # a memory map can't seek past its end like a file can, stop at the end
+                self._f.seek(min(self._f.tell() + read_size, len(self._f)))
+            else:
+                self._f.seek(read_size, 1)
 
             # stash position before reading next buffer header
             last_position = self._f.tell()
@@ -3,13 +3,28 @@ Logging factory and handlers
 """
 
 import logging
-from logging.handlers import RotatingFileHandler
+import os
+import queue
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from multiprocessing.util import Finalize
 from pathlib import Path
+from threading import Lock
 from typing import Optional, Union
 
 from rich.logging import RichHandler
 
-from miniscope_io.models.config import LOG_LEVELS, Config
+from miniscope_io.models.config import LOG_LEVELS, get_config
+
+_LOGGERS: set[str] = set()
+"""
+Names of loggers that have already been configured by :func:`.init_logger`
+"""
+_INIT_LOCKS = [Lock() for _ in range(16)]
+"""
+Held while configuring a new logger so concurrent calls don't both add handlers.
+Sharded by logger name so that unrelated loggers can be configured concurrently.
+"""
 
 
 def init_logger(
@@ -25,6 +40,17 @@ def init_logger(
 
     Log to a set of rotating files in the ``log_dir`` according to ``name`` ,
     as well as using the :class:`~rich.RichHandler` for pretty-formatted stdout logs.
+    File logs are written from a background thread (see :class:`.QueuedFileHandler` ),
+    call ``flush()`` on the logger's handlers to wait for pending records to be written.
+
+    Loggers are only configured the first time they are requested -
+    subsequent calls with the same ``name`` return the existing logger unchanged
+    rather than adding another set of handlers.
+
+    Arguments that aren't given are taken from the process-wide :class:`.Config`
+    (see :func:`.get_config` ), which is loaded when the first logger is made.
+    Changes to ``MINISCOPE_IO_*`` environment variables or the ``.env`` file
+    after that point are not picked up.
 
     Args:
         name (str): Name of this logger. Ideally names are hierarchical
@@ -44,53 +70,160 @@ def init_logger(
     Returns:
         :class:`logging.Logger`
     """
-    config = Config()
-    if log_dir is None:
-        log_dir = config.log_dir
-    if level is None:
-        level = config.logs.level_stdout
-    if file_level is None:
-        file_level = config.logs.level_file
-    if log_file_n is None:
-        log_file_n = config.logs.file_n
-    if log_file_size is None:
-        log_file_size = config.logs.file_size
-
     if not name.startswith("miniscope_io"):
         name = "miniscope_io." + name
 
-    logger = logging.getLogger(name)
-    logger.setLevel(level)
+    if name in _LOGGERS:
+        return logging.getLogger(name)
+
+    with _INIT_LOCKS[hash(name) % len(_INIT_LOCKS)]:
+        # another thread may have finished configuring it while we waited
+        if name in _LOGGERS:
+            return logging.getLogger(name)
+
+        config = get_config()
+        if log_dir is None:
+            log_dir = config.log_dir
+        if level is None:
+            level = config.logs.level_stdout
+        if file_level is None:
+            file_level = config.logs.level_file
+        if log_file_n is None:
+            log_file_n = config.logs.file_n
+        if log_file_size is None:
+            log_file_size = config.logs.file_size
+
+        logger = logging.getLogger(name)
+        logger.setLevel(level)
+
+        # Add handlers for stdout and file
+        if log_dir is not False:
+            logger.addHandler(_file_handler(name, file_level, log_dir, log_file_n, log_file_size))
+
+        logger.addHandler(_rich_handler())
+
+        _LOGGERS.add(name)
+        return logger
+
+
+class _FileLogListener(QueueListener):
+    """
+    Passes each queued record to the file handler it was queued for,
+    so one listener thread can serve the file handlers of every logger.
+    """
+
+    def handle(self, record: tuple[logging.Handler, logging.LogRecord]) -> None:
+        """Handle a ``(handler, record)`` pair put in the queue by :class:`.QueuedFileHandler`"""
+        handler, record = record
+        if record.levelno >= handler.level:
+            handler.handle(record)
+
+
+_FILE_LISTENER: Optional[_FileLogListener] = None
+"""
+Listener shared by all :class:`.QueuedFileHandler` s in this process, started on first use
+"""
+_FILE_LISTENER_LOCK = Lock()
+
 
-    # Add handlers for stdout and file
-    if log_dir is not False:
-        logger.addHandler(_file_handler(name, file_level, log_dir, log_file_n, log_file_size))
+def _file_listener() -> _FileLogListener:
+    """Get the shared file log listener, starting it if needed"""
+    global _FILE_LISTENER
+    if _FILE_LISTENER is None:
+        with _FILE_LISTENER_LOCK:
+            if _FILE_LISTENER is None:
+                listener = _FileLogListener(queue.Queue())
+                listener.start()
+                # atexit hooks aren't run when multiprocessing children exit, finalizers are
+                Finalize(None, _stop_file_listener, exitpriority=0)
+                _FILE_LISTENER = listener
+    return _FILE_LISTENER
 
-    logger.addHandler(_rich_handler())
 
-    return logger
+def _stop_file_listener() -> None:
+    """Write any remaining records and stop the shared listener"""
+    global _FILE_LISTENER
+    with _FILE_LISTENER_LOCK:
+        if _FILE_LISTENER is not None:
+            _FILE_LISTENER.stop()
+            _FILE_LISTENER = None
+
+
+def _reset_file_listener() -> None:
+    """
+    Threads don't survive a fork, so forget the parent's listener in a forked child
+    (eg. :class:`multiprocessing.Process` ) - a new one is started there on first use,
+    and anything left in the parent's queue is the parent's to write.
+    """
+    global _FILE_LISTENER, _FILE_LISTENER_LOCK
+    _FILE_LISTENER = None
+    _FILE_LISTENER_LOCK = Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_file_listener)
+
+
+class QueuedFileHandler(QueueHandler):
+    """
+    Write log records to a file handler from a background thread.
+
+    Logging calls just put the record in a queue shared by every file handler,
+    and a single :class:`~logging.handlers.QueueListener` thread per process passes them
+    on to the wrapped handler, so code that logs doesn't wait on disk I/O or log rotation.
+
+    Args:
+        handler (:class:`logging.Handler`): Handler that actually writes the records
+    """
+
+    def __init__(self, handler: logging.Handler):
+        # records go to the shared listener's queue, see enqueue
+        super().__init__(None)
+        self.handler = handler
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Put a record in the shared queue, to be written by our handler"""
+        _file_listener().queue.put_nowait((self.handler, record))
+
+    def flush(self) -> None:
+        """Wait until all queued records have been written"""
+        if _FILE_LISTENER is not None:
+            _FILE_LISTENER.queue.join()
+        self.handler.flush()
+
+    def close(self) -> None:
+        """Write any remaining records and close the wrapped handler"""
+        self.flush()
+        self.handler.close()
+        super().close()
 
 
 def _file_handler(
     name: str,
     file_level: LOG_LEVELS,
     log_dir: Path,
-    log_file_n: int = 5,
-    log_file_size: int = 2**22,
-) -> RotatingFileHandler:
+    log_file_n: int,
+    log_file_size: int,
+) -> QueuedFileHandler:
     # See init_logger for arg docs
 
-    filename = Path(log_dir) / ".".join([name, "log"])
+    filename = os.path.join(log_dir, name + ".log")
+    # don't open the file until there is something to write to it
     file_handler = RotatingFileHandler(
-        str(filename), mode="a", maxBytes=log_file_size, backupCount=log_file_n
+        filename, mode="a", maxBytes=log_file_size, backupCount=log_file_n, delay=True
     )
     file_formatter = logging.Formatter("[%(asctime)s] %(levelname)s [%(name)s]: %(message)s")
     file_handler.setLevel(file_level)
     file_handler.setFormatter(file_formatter)
-    return file_handler
+
+    queued_handler = QueuedFileHandler(file_handler)
+    queued_handler.setLevel(file_level)
+    return queued_handler
 
 
+@lru_cache(maxsize=1)
 def _rich_handler() -> RichHandler:
+    # every logger uses the same format, so they can all share one handler
     rich_handler = RichHandler(rich_tracebacks=True, markup=True)
     rich_formatter = logging.Formatter(
         "[bold green]\[%(name)s][/bold green] %(message)s",
@@ -2,6 +2,7 @@
 Module-global configuration models
 """
 
+from functools import lru_cache
 from pathlib import Path
 from typing import Literal, Optional
 
@@ -92,9 +93,8 @@ class Config(BaseSettings):
     def folder_exists(cls, v: Path) -> Path:
         """Ensure base_dir exists, make it otherwise"""
         v = Path(v)
+        # mkdir raises if it can't make the directory, no need to stat it again afterwards
         v.mkdir(exist_ok=True, parents=True)
-
-        assert v.exists(), f"{v} does not exist!"
         return v
 
     @model_validator(mode="after")
@@ -107,7 +107,6 @@ class Config(BaseSettings):
                 path = self.base_dir / path
                 setattr(self, path_name, path)
             path.mkdir(exist_ok=True)
-            assert path.exists()
         return self
 
     model_config = SettingsConfigDict(
@@ -116,3 +115,15 @@ class Config(BaseSettings):
         env_nested_delimiter="__",
         extra="ignore",
     )
+
+
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """
+    Get the process-wide :class:`.Config` , loading it on first use.
+
+    Constructing a :class:`.Config` re-reads the environment and ``.env`` file and
+    re-validates every field, so code that just needs the current settings
+    should use this rather than making a new instance each time.
+    """
+    return Config()
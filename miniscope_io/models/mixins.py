@@ -3,14 +3,30 @@ Mixin classes that are to be used alongside specific models
 to use composition for functionality and inheritance for semantics.
 """
 
+import copy
+import os
+from functools import lru_cache
 from pathlib import Path
-from typing import Type, TypeVar, Union
+from typing import Any, Type, TypeVar, Union
 
 import yaml
 
 T = TypeVar("T")
 
 
+@lru_cache(maxsize=32)
+def _load_yaml(file_path: str, mtime_ns: int, size: int) -> Any:
+    """
+    Parse a yaml file, cached by path, modification time, and size
+    so a file is only parsed again when it changes.
+
+    Some filesystems only store modification times to the nearest second or two,
+    so the size is also checked to catch edits made within that window.
+    """
+    with open(file_path) as file:
+        return yaml.safe_load(file)
+
+
 class YAMLMixin:
     """
     Mixin class that provides :meth:`.from_yaml` and :meth:`.to_yaml`
@@ -20,6 +36,8 @@ class YAMLMixin:
     @classmethod
     def from_yaml(cls: Type[T], file_path: Union[str, Path]) -> T:
         """Instantiate this class by passing the contents of a yaml file as kwargs"""
-        with open(file_path) as file:
-            config_data = yaml.safe_load(file)
+        file_path = os.path.abspath(file_path)
+        # copy so the cached data can't be changed through the instance
+        stat = os.stat(file_path)
+        config_data = copy.deepcopy(_load_yaml(file_path, stat.st_mtime_ns, stat.st_size))
         return cls(**config_data)
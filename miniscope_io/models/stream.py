@@ -2,8 +2,9 @@
 Models for :mod:`miniscope_io.stream_daq`
 """
 
+from collections import namedtuple
 from pathlib import Path
-from typing import Literal, Optional, Union
+from typing import List, Literal, Optional, Union
 
 from pydantic import Field, computed_field, field_validator
 
@@ -126,6 +127,16 @@ class StreamBufferHeader(BufferHeader):
             return self._adc_scaling.scale_input_voltage(self.input_voltage_raw)
 
 
+RawStreamBufferHeader = namedtuple("RawStreamBufferHeader", StreamBufferHeader.model_fields)
+"""
+Unvalidated header values, with the same fields as :class:`.StreamBufferHeader` .
+
+Used while grouping buffers into frames, where a pydantic model per buffer is
+more overhead than needed. Convert with ``StreamBufferHeader(**header._asdict())``
+(or :meth:`~pydantic.BaseModel.model_construct` ) where the model is needed.
+"""
+
+
 class StreamDevRuntime(MiniscopeConfig):
     """
     Runtime configuration for :class:`.StreamDaq`
@@ -146,6 +157,21 @@ class StreamDevRuntime(MiniscopeConfig):
         5,
         description="Buffer length for storing images in streamDaq",
     )
+    fpga_read_buffers: int = Field(
+        8,
+        description="Number of buffers worth of data to read from the FPGA at once "
+        "when no ``read_length`` is given. Larger reads spread the overhead of each "
+        "USB transfer over more data",
+    )
+    worker_affinity: Optional[List[int]] = Field(
+        None,
+        description="CPUs to pin the receiving, buffer-grouping, and frame-formatting "
+        "processes to, in that order, so each pipeline stage stays on its own core. "
+        "If ``None``, processes are scheduled normally. "
+        "Only supported on platforms with :func:`os.sched_setaffinity` (eg. Linux)",
+        min_length=3,
+        max_length=3,
+    )
     plot: Optional[StreamPlotterConfig] = Field(
         StreamPlotterConfig(
             keys=["timestamp", "buffer_count", "frame_buffer_count"], update_ms=1000, history=500
@@ -5,30 +5,49 @@ DAQ For use with FPGA and Uart streaming video sources.
 import logging
 import multiprocessing
 import os
+import queue
 import sys
+import threading
 import time
+from contextlib import nullcontext
+from itertools import accumulate
+from operator import attrgetter
 from pathlib import Path
-from typing import Any, Callable, Generator, List, Literal, Optional, Tuple, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Generator,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import cv2
 import numpy as np
 import serial
-from bitstring import BitArray, Bits
+from bitstring import Bits
 
 from miniscope_io import init_logger
-from miniscope_io.bit_operation import BufferFormatter
+from miniscope_io.bit_operation import BufferFormatter, PreambleScanner
 from miniscope_io.devices.mocks import okDevMock
 from miniscope_io.exceptions import EndOfRecordingException, StreamReadError
 from miniscope_io.formats.stream import StreamBufferHeader as StreamBufferHeaderFormat
-from miniscope_io.io import BufferedCSVWriter
+from miniscope_io.io import BufferedCSVWriter, ThreadedVideoWriter
 from miniscope_io.models.stream import (
+    RawStreamBufferHeader,
     StreamBufferHeader,
     StreamDevConfig,
 )
 from miniscope_io.models.stream import (
     StreamBufferHeaderFormat as StreamBufferHeaderFormatType,
 )
-from miniscope_io.plots.headers import StreamPlotter
+
+if TYPE_CHECKING:
+    from miniscope_io.plots.headers import StreamPlotter
 
 HAVE_OK = False
 ok_error = None
@@ -108,37 +127,39 @@ class StreamDaq:
         self.preamble = self.config.preamble
         self.terminate: multiprocessing.Event = multiprocessing.Event()
 
-        self._buffer_npix: Optional[List[int]] = None
-        self._nbuffer_per_fm: Optional[int] = None
-        self._buffered_writer: Optional[BufferedCSVWriter] = None
-        self._header_plotter: Optional[StreamPlotter] = None
-
-    @property
-    def buffer_npix(self) -> List[int]:
-        """List of pixels per buffer for a frame"""
-        if self._buffer_npix is None:
-            px_per_frame = self.config.frame_width * self.config.frame_height
-            byte_per_word = np.iinfo(np.int32).bits / np.iinfo(np.int8).bits
-
-            px_per_buffer = (
-                self.config.buffer_block_length * self.config.block_size
-                - self.config.header_len / np.iinfo(np.int8).bits
-                - self.config.dummy_words * byte_per_word
-            )
-            quotient, remainder = divmod(px_per_frame, px_per_buffer)
-            self._buffer_npix = [int(px_per_buffer)] * int(quotient) + [int(remainder)]
-        return self._buffer_npix
+        # lengths used to parse every buffer
+        self._header_len_words = self.config.header_len // 32
+        self._preamble_len_words = len(Bits(self.config.preamble)) // 32
+
+        # header fields and the word they are found in, taken out of header_fmt once
+        header_fields = {k: v for k, v in header_fmt.model_dump().items() if v is not None}
+        self._header_names = tuple(header_fields.keys())
+        self._header_index = np.array(list(header_fields.values()), dtype=np.intp)
+
+        # buffer geometry is fixed by the config, so compute it once
+        px_per_frame = self.config.frame_width * self.config.frame_height
+        byte_per_word = np.iinfo(np.int32).bits / np.iinfo(np.int8).bits
+        px_per_buffer = (
+            self.config.buffer_block_length * self.config.block_size
+            - self.config.header_len / np.iinfo(np.int8).bits
+            - self.config.dummy_words * byte_per_word
+        )
+        quotient, remainder = divmod(px_per_frame, px_per_buffer)
+        self.buffer_npix: Tuple[int, ...] = (int(px_per_buffer),) * int(quotient) + (
+            int(remainder),
+        )
+        """Number of pixels in each buffer of a frame"""
+        self.nbuffer_per_fm: int = len(self.buffer_npix)
+        """Number of buffers per frame, computed from :attr:`.buffer_npix`"""
 
-    @property
-    def nbuffer_per_fm(self) -> int:
-        """
-        Number of buffers per frame, computed from :attr:`.buffer_npix`
-        """
-        if self._nbuffer_per_fm is None:
-            self._nbuffer_per_fm = len(self.buffer_npix)
-        return self._nbuffer_per_fm
+        self._buffered_writer: Optional[BufferedCSVWriter] = None
+        # reads the values of a header in the order of ``model_dump()`` for the metadata csv
+        self._header_values = attrgetter(
+            *StreamBufferHeader.model_fields, *StreamBufferHeader.model_computed_fields
+        )
+        self._header_plotter: Optional["StreamPlotter"] = None
 
-    def _parse_header(self, buffer: bytes) -> Tuple[StreamBufferHeader, np.ndarray]:
+    def _parse_header(self, buffer: bytes) -> Tuple[RawStreamBufferHeader, np.ndarray]:
         """
         Function to parse header from each buffer.
 
@@ -149,34 +170,40 @@ class StreamDaq:
 
         Returns
         -------
-        Tuple[BufferHeader, ndarray]
+        Tuple[RawStreamBufferHeader, ndarray]
             The returned header data and payload (uint8).
         """
 
         header, payload = BufferFormatter.bytebuffer_to_ndarrays(
             buffer=buffer,
-            header_length_words=int(self.config.header_len / 32),
-            preamble_length_words=int(len(Bits(self.config.preamble)) / 32),
+            header_length_words=self._header_len_words,
+            preamble_length_words=self._preamble_len_words,
             reverse_header_bits=self.config.reverse_header_bits,
             reverse_header_bytes=self.config.reverse_header_bytes,
             reverse_payload_bits=self.config.reverse_payload_bits,
             reverse_payload_bytes=self.config.reverse_payload_bytes,
         )
 
-        header_data = StreamBufferHeader.from_format(header, self.header_fmt, construct=True)
-        header_data.adc_scaling = self.config.adc_scale
+        # pulls every field out of the header in one indexing operation,
+        # the pydantic model is only made by _handle_frame when metadata is used
+        header_data = RawStreamBufferHeader(
+            **dict(zip(self._header_names, header[self._header_index].tolist()))
+        )
 
         return header_data, payload
 
     def _trim(
         self,
         data: np.ndarray,
-        expected_size_array: List[int],
-        header: StreamBufferHeader,
+        expected_size_array: Sequence[int],
+        header: RawStreamBufferHeader,
         logger: logging.Logger,
     ) -> np.ndarray:
         """
-        Trim or pad an array to match an expected size
+        Trim an array to at most an expected size
+
+        Shorter arrays are returned as-is: :meth:`._buffer_to_frame` writes them into
+        an already zeroed slot in the frame, which pads them without another copy.
 
         .. todo::
             Re-think about the timing to deal with dummy words.
@@ -190,19 +217,19 @@ class StreamDaq:
         # This validation is temporary. More info in todo above.
         if data.shape[0] != expected_payload_size + self.config.dummy_words * 4:
             logger.warning(
-                f"Frame {header.frame_num}; Buffer {header.buffer_count} "
-                f"(#{header.frame_buffer_count} in frame)\n"
-                f"Expected buffer data length: {expected_payload_size}, got data with shape "
-                f"{data.shape}.\nPadding to expected length",
+                "Frame %d; Buffer %d (#%d in frame)\n"
+                "Expected buffer data length: %d, got data with shape %s.\n"
+                "Padding to expected length",
+                header.frame_num,
+                header.buffer_count,
+                header.frame_buffer_count,
+                expected_payload_size,
+                data.shape,
             )
 
-        if data.shape[0] != expected_data_size:
-            # trim if too long
-            if data.shape[0] > expected_data_size:
-                data = data[0:expected_data_size]
-            # pad if too short
-            else:
-                data = np.pad(data, (0, expected_data_size - data.shape[0]))
+        # trim if too long
+        if data.shape[0] > expected_data_size:
+            data = data[0:expected_data_size]
 
         return data
 
@@ -222,24 +249,36 @@ class StreamDaq:
         baudrate : int
             _description_
         """
-        pre_bytes = self.preamble.tobytes()
+        pre = Bits(self.preamble)
         if self.config.reverse_header_bits:
-            pre_bytes = bytes(bytearray(pre_bytes)[::-1])
+            pre = pre[::-1]
+        pre_bytes = pre.tobytes()
 
         # set up serial port
         serial_port = serial.Serial(port=comport, baudrate=baudrate, timeout=5, stopbits=1)
         self.logger.info("Serial port open: " + str(serial_port.name))
 
-        # Throw away the first buffer because it won't fully come in
-        uart_bites = serial_port.read_until(pre_bytes)
-        log_uart_buffer = BitArray([x for x in uart_bites])
+        # read whatever has arrived rather than one byte at a time as read_until does,
+        # and search it for the preamble with bytes.find
+        data = bytearray()
+        search_start = 0
+        first = True
 
         try:
             while 1:
-                # read UART data until preamble and put into queue
-                uart_bites = serial_port.read_until(pre_bytes)
-                log_uart_buffer = [x for x in uart_bites]
-                serial_buffer_queue.put(log_uart_buffer)
+                data.extend(serial_port.read(max(serial_port.in_waiting, 1)))
+                idx = data.find(pre_bytes, search_start)
+                while idx != -1:
+                    # put UART data up to and including the preamble into queue
+                    end = idx + len(pre_bytes)
+                    if first:
+                        # Throw away the first buffer because it won't fully come in
+                        first = False
+                    else:
+                        serial_buffer_queue.put(bytes(data[:end]))
+                    del data[:end]
+                    idx = data.find(pre_bytes)
+                search_start = max(len(data) - len(pre_bytes) + 1, 0)
         finally:
             time.sleep(1)  # time for ending other process
             serial_port.close()
@@ -273,9 +312,12 @@ class StreamDaq:
         Function to read bitstream from OpalKelly device and store buffer in `serial_buffer_queue`.
 
         The bits data are read in fixed chunks defined by `read_length`.
-        Then we concatenate the chunks and try to look for `self.preamble` in the data.
+        Then we concatenate the chunks and try to look for `self.preamble` in the data
+        (at any bit offset, see :class:`.PreambleScanner` ).
         The data between every pair of `self.preamble` is considered to be a single buffer and
         stored in `serial_buffer_queue`.
+        Reading from the device happens in a separate thread (see :meth:`._fpga_read` ),
+        so the next chunk is transferred while the previous one is being split into buffers.
 
         Parameters
         ----------
@@ -283,7 +325,8 @@ class StreamDaq:
             The queue holding the buffer data.
         read_length : int, optional
             Length of data to read in chunks (in number of bytes), by default None.
-            If `None`, an optimal length is estimated so that it roughly covers a single buffer
+            If `None`, an optimal length is estimated so that it roughly covers
+            ``runtime.fpga_read_buffers`` buffers
             and is an integer multiple of 16 bytes (as recommended by OpalKelly).
         pre_first : bool, optional
             Whether preamble/header is returned at the beginning of each buffer, by default True.
@@ -302,7 +345,11 @@ class StreamDaq:
             )
         # determine length
         if read_length is None:
-            read_length = int(max(self.buffer_npix) * self.config.pix_depth / 8 / 16) * 16
+            read_length = (
+                int(max(self.buffer_npix) * self.config.pix_depth / 8 / 16)
+                * 16
+                * self.config.runtime.fpga_read_buffers
+            )
 
         # set up fpga devices
         BIT_FILE = self.config.bitstream
@@ -313,40 +360,62 @@ class StreamDaq:
         dev = self._init_okdev(BIT_FILE)
 
         # read loop
-        cur_buffer = BitArray()
         pre = Bits(self.preamble)
         if self.config.reverse_header_bits:
             pre = pre[::-1]
+        scanner = PreambleScanner(pre.tobytes())
+        offset = 0 if pre_first else len(self.preamble)
+
+        read_queue = queue.Queue(maxsize=4)
+        reader = threading.Thread(
+            target=self._fpga_read,
+            args=(dev, read_length, read_queue, locallogs),
+            name="_fpga_read",
+            daemon=True,
+        )
 
         locallogs.debug("Starting capture")
+        try:
+            # keep the binary file open for the whole capture rather than reopening per read
+            with open(capture_binary, "ab") if capture_binary else nullcontext() as binary_file:
+                reader.start()
+                for buf in exact_iter(read_queue.get, None):
+                    if binary_file:
+                        binary_file.write(buf)
+
+                    for buffer in scanner.feed(buf, offset):
+                        serial_buffer_queue.put(buffer)
+        except KeyboardInterrupt:
+            locallogs.debug("Got keyboard interrupt, breaking")
+        finally:
+            locallogs.debug("Quitting, putting sentinel in queue")
+            serial_buffer_queue.put(None)
+
+    def _fpga_read(
+        self,
+        dev: Union[okDev, okDevMock],
+        read_length: int,
+        read_queue: queue.Queue,
+        locallogs: logging.Logger,
+    ) -> None:
+        """
+        Read chunks of `read_length` bytes from the device into `read_queue`
+        until the recording ends or :attr:`.terminate` is set,
+        then put a ``None`` sentinel in the queue.
+
+        Run in a thread by :meth:`._fpga_recv` .
+        """
         try:
             while not self.terminate.is_set():
                 try:
-                    buf = dev.readData(read_length)
-                except (EndOfRecordingException, StreamReadError, KeyboardInterrupt):
+                    read_queue.put(dev.readData(read_length))
+                except (EndOfRecordingException, StreamReadError):
                     locallogs.debug("Got end of recording exception, breaking")
                     break
-
-                if capture_binary:
-                    with open(capture_binary, "ab") as file:
-                        file.write(buf)
-
-                dat = BitArray(buf)
-                cur_buffer = cur_buffer + dat
-                pre_pos = list(cur_buffer.findall(pre))
-                for buf_start, buf_stop in zip(pre_pos[:-1], pre_pos[1:]):
-                    if not pre_first:
-                        buf_start, buf_stop = (
-                            buf_start + len(self.preamble),
-                            buf_stop + len(self.preamble),
-                        )
-                    serial_buffer_queue.put(cur_buffer[buf_start:buf_stop].tobytes())
-                if pre_pos:
-                    cur_buffer = cur_buffer[pre_pos[-1] :]
-
+        except Exception as e:
+            locallogs.exception(f"Error reading from device: {e}")
         finally:
-            locallogs.debug("Quitting, putting sentinel in queue")
-            serial_buffer_queue.put(None)
+            read_queue.put(None)
 
     def _buffer_to_frame(
         self,
@@ -358,9 +427,9 @@ class StreamDaq:
 
         Pull out buffers in `serial_buffer_queue`, then get frame and buffer index by
         parsing headers in the buffer.
-        The buffers belonging to the same frame are put in the same list at
-        corresponding buffer index.
-        The lists representing each frame are then put into `frame_buffer_queue`.
+        The buffers belonging to the same frame are written into the same array at
+        the position of their buffer index.
+        The arrays representing each frame are then put into `frame_buffer_queue`.
 
         Parameters
         ----------
@@ -372,9 +441,11 @@ class StreamDaq:
         locallogs = init_logger("streamDaq.buffer")
 
         cur_fm_num = -1  # Frame number
+        buffer_npix = self.buffer_npix
 
-        frame_buffer_prealloc = [np.zeros(bufsize, dtype=np.uint8) for bufsize in self.buffer_npix]
-        frame_buffer = frame_buffer_prealloc.copy()
+        # each buffer has a fixed place in the frame, sized according to buffer_npix
+        buffer_offsets = list(accumulate(buffer_npix, initial=0))
+        frame_buffer = np.zeros(buffer_offsets[-1], dtype=np.uint8)
         header_list = []
 
         try:
@@ -386,20 +457,25 @@ class StreamDaq:
                 try:
                     serial_buffer = self._trim(
                         serial_buffer,
-                        self.buffer_npix,
+                        buffer_npix,
                         header_data,
                         locallogs,
                     )
                 except IndexError:
                     locallogs.warning(
-                        f"Frame {header_data.frame_num}; Buffer {header_data.buffer_count} "
-                        f"(#{header_data.frame_buffer_count} in frame)\n"
-                        f"Frame buffer count {header_data.frame_buffer_count} "
-                        f"exceeds buffer number per frame {len(self.buffer_npix)}\n"
-                        f"Discarding buffer."
+                        "Frame %d; Buffer %d (#%d in frame)\n"
+                        "Frame buffer count %d exceeds buffer number per frame %d\n"
+                        "Discarding buffer.",
+                        header_data.frame_num,
+                        header_data.buffer_count,
+                        header_data.frame_buffer_count,
+                        header_data.frame_buffer_count,
+                        self.nbuffer_per_fm,
                     )
                     if header_list:
-                        frame_buffer_queue.put((None, header_list))
+                        # queued items are pickled in the background, copy so later
+                        # headers aren't added to the list before it is sent
+                        frame_buffer_queue.put((None, header_list.copy()))
                     continue
 
                 # if first buffer of a frame
@@ -412,7 +488,7 @@ class StreamDaq:
                     frame_buffer_queue.put((frame_buffer, header_list))
 
                     # init new frame_buffer
-                    frame_buffer = frame_buffer_prealloc.copy()
+                    frame_buffer = np.zeros(buffer_offsets[-1], dtype=np.uint8)
                     header_list = []
 
                     # update frame_num and index
@@ -420,18 +496,17 @@ class StreamDaq:
 
                     if header_data.frame_buffer_count != 0:
                         locallogs.warning(
-                            f"Frame {cur_fm_num} started with buffer "
-                            f"{header_data.frame_buffer_count}"
+                            "Frame %d started with buffer %d",
+                            cur_fm_num,
+                            header_data.frame_buffer_count,
                         )
 
-                    # update data
-                    frame_buffer[header_data.frame_buffer_count] = serial_buffer
-
                 else:
-                    frame_buffer[header_data.frame_buffer_count] = serial_buffer
-                    locallogs.debug(
-                        "----buffer #" + str(header_data.frame_buffer_count) + " stored"
-                    )
+                    locallogs.debug("----buffer #%d stored", header_data.frame_buffer_count)
+
+                # update data, short buffers are zero-padded by the rest of their slot
+                buffer_start = buffer_offsets[header_data.frame_buffer_count]
+                frame_buffer[buffer_start : buffer_start + serial_buffer.shape[0]] = serial_buffer
 
         finally:
             frame_buffer_queue.put((None, header_list))  # for getting remaining buffers.
@@ -446,18 +521,15 @@ class StreamDaq:
         """
         Construct frame from grouped buffers.
 
-        Each frame data is concatenated from a list of buffers in `frame_buffer_queue`
-        according to `buffer_npix`.
-        If there is any mismatch between the expected length of each buffer
-        (defined by `buffer_npix`) and the actual length, then the buffer is either
-        truncated or zero-padded at the end to make the length appropriate,
-        and a warning is thrown.
-        Finally, the concatenated buffer data are converted into a 1d numpy array with
-        uint8 dtype and put into `imagearray` queue.
+        Each frame is a 1d uint8 array in `frame_buffer_queue` that the buffers
+        have been written into by :meth:`._buffer_to_frame` , according to `buffer_npix`.
+        The frame data are reshaped into the frame dimensions and put into `imagearray` queue.
+        If the frame is not the expected size, a warning is thrown
+        and it is replaced with zeros.
 
         Parameters
         ----------
-        frame_buffer_queue : multiprocessing.Queue[list[bytes]]
+        frame_buffer_queue : multiprocessing.Queue[tuple[np.ndarray, list]]
             Input buffer queue.
         imagearray : multiprocessing.Queue[np.ndarray]
             Output image array queue.
@@ -466,17 +538,14 @@ class StreamDaq:
         try:
             for frame_data, header_list in exact_iter(frame_buffer_queue.get, None):
 
-                if not frame_data:
-                    imagearray.put((None, header_list))
-                    continue
-                if len(frame_data) == 0:
+                if frame_data is None:
                     imagearray.put((None, header_list))
                     continue
-                frame_data = np.concatenate(frame_data, axis=0)
 
                 try:
+                    # rows are contiguous in the stream, as opencv expects
                     frame = np.reshape(
-                        frame_data, (self.config.frame_width, self.config.frame_height)
+                        frame_data, (self.config.frame_height, self.config.frame_width)
                     )
                 except ValueError as e:
                     expected_size = self.config.frame_width * self.config.frame_height
@@ -489,7 +558,7 @@ class StreamDaq:
                         provided_size,
                     )
                     frame = np.zeros(
-                        (self.config.frame_width, self.config.frame_height), dtype=np.uint8
+                        (self.config.frame_height, self.config.frame_width), dtype=np.uint8
                     )
                 imagearray.put((frame, header_list))
         finally:
@@ -502,10 +571,11 @@ class StreamDaq:
         """
         Create a parameterized video writer
 
+        Frames are written as single-channel grayscale unless ``isColor=True``
+        is passed in ``kwargs``.
+
         Parameters
         ----------
-        frame_buffer_queue : multiprocessing.Queue[list[bytes]]
-            Input buffer queue.
         path : Union[Path, str]
             Video file to write to
         fourcc : str
@@ -523,6 +593,7 @@ class StreamDaq:
         fourcc = cv2.VideoWriter_fourcc(*fourcc)
         frame_rate = self.config.fs
         frame_size = (self.config.frame_width, self.config.frame_height)
+        kwargs.setdefault("isColor", False)
         out = cv2.VideoWriter(str(path), fourcc, frame_rate, frame_size, **kwargs)
         return out
 
@@ -568,14 +639,11 @@ class StreamDaq:
         """
         self.terminate.clear()
 
-        shared_resource_manager = multiprocessing.Manager()
-        serial_buffer_queue = shared_resource_manager.Queue(
-            self.config.runtime.serial_buffer_queue_size
-        )
-        frame_buffer_queue = shared_resource_manager.Queue(
-            self.config.runtime.frame_buffer_queue_size
-        )
-        imagearray = shared_resource_manager.Queue(self.config.runtime.image_buffer_queue_size)
+        # plain queues pass items over a pipe directly between processes,
+        # rather than through a manager process
+        serial_buffer_queue = multiprocessing.Queue(self.config.runtime.serial_buffer_queue_size)
+        frame_buffer_queue = multiprocessing.Queue(self.config.runtime.frame_buffer_queue_size)
+        imagearray = multiprocessing.Queue(self.config.runtime.image_buffer_queue_size)
 
         if source == "uart":
             self.logger.debug("Starting uart capture process")
@@ -597,13 +665,6 @@ class StreamDaq:
         else:
             raise ValueError(f"source can be one of uart or fpga. Got {source}")
 
-        # Video output
-        writer = None
-        if video:
-            if video_kwargs is None:
-                video_kwargs = {}
-            writer = self.init_video(video, **video_kwargs)
-
         p_buffer_to_frame = multiprocessing.Process(
             target=self._buffer_to_frame,
             args=(
@@ -624,8 +685,23 @@ class StreamDaq:
         p_recv.start()
         p_buffer_to_frame.start()
         p_format_frame.start()
+        self._pin_workers([p_recv, p_buffer_to_frame, p_format_frame])
+
+        # Video output
+        # (after starting the child processes so they aren't forked with the writer thread running)
+        writer = None
+        if video:
+            if video_kwargs is None:
+                video_kwargs = {}
+            writer = ThreadedVideoWriter(
+                self.init_video(video, **video_kwargs),
+                is_color=video_kwargs.get("isColor", False),
+            )
 
         if show_metadata:
+            # imported here so matplotlib (an optional dependency) is only loaded when plotting
+            from miniscope_io.plots.headers import StreamPlotter
+
             self._header_plotter = StreamPlotter(
                 header_keys=self.config.runtime.plot.keys,
                 history_length=self.config.runtime.plot.history,
@@ -692,12 +768,29 @@ class StreamDaq:
                     p.join()
             self.logger.info("Child processes joined. End capture.")
 
+    def _pin_workers(self, processes: List[multiprocessing.Process]) -> None:
+        """
+        Pin each capture process to its CPU in ``runtime.worker_affinity`` , if configured.
+        """
+        affinity = self.config.runtime.worker_affinity
+        if affinity is None:
+            return
+        if not hasattr(os, "sched_setaffinity"):
+            self.logger.warning("CPU affinity is not supported on this platform, not pinning")
+            return
+
+        for p, cpu in zip(processes, affinity):
+            try:
+                os.sched_setaffinity(p.pid, {cpu})
+            except OSError as e:
+                self.logger.warning(f"Could not pin process {p.name} to CPU {cpu}: {e}")
+
     def _handle_frame(
         self,
         image: np.ndarray,
-        header_list: list[StreamBufferHeader],
+        header_list: list[RawStreamBufferHeader],
         show_video: bool,
-        writer: Optional[cv2.VideoWriter],
+        writer: Optional[ThreadedVideoWriter],
         show_metadata: bool,
         metadata: Optional[Path] = None,
     ) -> None:
@@ -709,14 +802,16 @@ class StreamDaq:
             Further refactor to break into smaller pieces, not have to pass 100 args every time.
 
         """
-        if show_video is True:
+        # items with no image only carry headers of discarded buffers, skip the GUI for them
+        if show_video is True and image is not None:
             cv2.imshow("image", image)
             cv2.waitKey(1)
-        if writer:
-            picture = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)  # If your image is grayscale
-            writer.write(picture)
+        if writer and image is not None:
+            writer.write(image)
         if show_metadata or metadata:
-            for header in header_list:
+            for raw_header in header_list:
+                header = StreamBufferHeader.model_construct(**raw_header._asdict())
+                header.adc_scaling = self.config.adc_scale
                 if show_metadata:
                     self.logger.debug("Plotting header metadata")
                     try:
@@ -726,7 +821,7 @@ class StreamDaq:
                 if metadata:
                     self.logger.debug("Saving header metadata")
                     try:
-                        self._buffered_writer.append(list(header.model_dump().values()))
+                        self._buffered_writer.append(self._header_values(header))
                     except Exception as e:
                         self.logger.exception(f"Exception saving headers: \n{e}")
 
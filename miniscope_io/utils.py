@@ -3,6 +3,8 @@ The junk drawer my dogs
 """
 
 import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import TYPE_CHECKING, Union
 
@@ -12,6 +14,10 @@ if TYPE_CHECKING:
     pass
 
 
+_PIPELINE_HASH_SIZE = 16 * 2**20
+"""Files larger than this (in bytes) are hashed with :func:`._hash_file_pipelined`"""
+
+
 def hash_file(path: Union[Path, str]) -> str:
     """
     Return the sha256 hash of a file
@@ -26,12 +32,31 @@ def hash_file(path: Union[Path, str]) -> str:
     References:
         https://stackoverflow.com/a/44873382
     """
-    h = hashlib.sha256()
+    if os.path.getsize(path) > _PIPELINE_HASH_SIZE:
+        return _hash_file_pipelined(path)
+
     with open(path, "rb") as f:
-        while True:
-            chunk = f.read(h.block_size)
-            if not chunk:
-                break
+        if hasattr(hashlib, "file_digest"):
+            # python >= 3.11, reads and hashes the file without a python-level loop
+            return hashlib.file_digest(f, "sha256").hexdigest()
+
+        h = hashlib.sha256()
+        for chunk in iter(lambda: f.read(2**18), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _hash_file_pipelined(path: Union[Path, str], chunk_size: int = 4 * 2**20) -> str:
+    """
+    sha256 hash of a file, reading the next chunk in a thread while hashing the last one.
+
+    Both reading and hashing large chunks release the GIL, so they overlap.
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f, ThreadPoolExecutor(max_workers=1) as pool:
+        next_chunk = pool.submit(f.read, chunk_size)
+        while chunk := next_chunk.result():
+            next_chunk = pool.submit(f.read, chunk_size)
             h.update(chunk)
     return h.hexdigest()
 
@@ -1,6 +1,7 @@
 import pytest
 import numpy as np
-from miniscope_io.bit_operation import BufferFormatter
+from bitstring import BitArray, Bits
+from miniscope_io.bit_operation import BufferFormatter, PreambleScanner
 
 @pytest.mark.parametrize("test_input,header_length_words,preamble_length_words,reverse_header_bits,reverse_header_bytes,reverse_payload_bits,reverse_payload_bytes,expected_header,expected_payload",
     [
@@ -71,4 +72,35 @@ def test_reverse_byte_order_in_array(input_array, expected_output):
     Test for flipping byte order (8-bit chunks) in a 32-bit word.
     """
     result = BufferFormatter._reverse_byte_order_in_array(input_array)
-    np.testing.assert_array_equal(result, expected_output)
\ No newline at end of file
+    np.testing.assert_array_equal(result, expected_output)
+
+
+@pytest.mark.parametrize("offset", [0, 32])
+@pytest.mark.parametrize("chunk_size", [1, 7, 64])
+def test_preamble_scanner(chunk_size, offset):
+    """
+    The preamble should be found at any bit offset, with the buffers split the same way
+    as searching for it bit-by-bit does, regardless of how the stream is chunked
+    or whether the buffers are offset from the preamble.
+    """
+    rng = np.random.default_rng(0)
+    pre = Bits(b'\x12\x34\x56\x78')
+    stream = BitArray()
+    for length in rng.integers(40, 200, size=20):
+        stream += pre + BitArray(bytes(rng.integers(0, 256, size=32, dtype=np.uint8)))[:length]
+    stream += pre
+    data = stream.tobytes()
+
+    positions = list(stream.findall(pre))
+    expected = [
+        stream[start + offset:stop + offset].tobytes()
+        for start, stop in zip(positions[:-1], positions[1:])
+    ]
+
+    scanner = PreambleScanner(pre.tobytes())
+    buffers = []
+    for i in range(0, len(data), chunk_size):
+        buffers.extend(scanner.feed(data[i:i + chunk_size], offset))
+
+    assert buffers == expected
+
@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from miniscope_io import Config
+from miniscope_io import Config, get_config
 
 def test_config(tmp_path):
     """
@@ -45,3 +45,12 @@ def test_config_from_dotenv(tmp_path):
 
     config = Config(_env_file=dotenv, _env_file_encoding='utf-8')
     assert config.base_dir == Path(tmp_path)
+
+
+def test_get_config():
+    """
+    get_config should load the config once and reuse it
+    """
+    config = get_config()
+    assert isinstance(config, Config)
+    assert get_config() is config
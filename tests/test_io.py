@@ -3,7 +3,10 @@ import tempfile
 from pathlib import Path
 import os
 import csv
+import hashlib
+import mmap
 
+import cv2
 import numpy as np
 import warnings
 
@@ -11,10 +14,10 @@ from miniscope_io.models.data import Frame
 from miniscope_io.models.sdcard import SDBufferHeader
 from miniscope_io.formats import WireFreeSDLayout, WireFreeSDLayout_Battery
 from miniscope_io.io import SDCard
-from miniscope_io.io import BufferedCSVWriter
+from miniscope_io.io import BufferedCSVWriter, ThreadedVideoWriter, encoder_available
 from miniscope_io.exceptions import EndOfRecordingException
 from miniscope_io.models.data import Frame
-from miniscope_io.utils import hash_file, hash_video
+from miniscope_io.utils import _hash_file_pipelined, hash_file, hash_video
 
 from .fixtures import wirefree, wirefree_battery
 
@@ -86,6 +89,61 @@ def test_csvwriter_close(tmp_csvfile):
         assert len(rows) == 1
         assert rows == [['1', '2', '3']]
 
+def test_threaded_video_writer():
+    """
+    ThreadedVideoWriter writes queued frames in order and releases the writer.
+    """
+
+    class _Writer:
+        def __init__(self):
+            self.frames = []
+            self.released = False
+
+        def write(self, frame):
+            self.frames.append(frame)
+
+        def release(self):
+            self.released = True
+
+    inner = _Writer()
+    writer = ThreadedVideoWriter(inner, queue_size=2)
+    frames = [np.full((4, 6), i, dtype=np.uint8) for i in range(10)]
+    for frame in frames:
+        writer.write(frame)
+    writer.release()
+
+    assert inner.released
+    assert len(inner.frames) == len(frames)
+    assert all(np.array_equal(a, b) for a, b in zip(inner.frames, frames))
+    assert all(f.ndim == 2 for f in inner.frames)
+
+def test_video_y800_lossless(tmp_path):
+    """
+    Single-channel frames written as Y800 decode to exactly the frames that were written,
+    so hashes of decoded videos don't depend on the platform's colour conversion.
+    """
+    frames = np.random.default_rng(0).integers(0, 256, (5, 20, 30), dtype=np.uint8)
+    path = tmp_path / "video.avi"
+    writer = ThreadedVideoWriter(
+        cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"Y800"), 20, (30, 20), isColor=False)
+    )
+    for frame in frames:
+        writer.write(frame)
+    writer.release()
+
+    vid = cv2.VideoCapture(str(path))
+    decoded = []
+    while True:
+        ret, frame = vid.read()
+        if not ret:
+            break
+        decoded.append(frame)
+    vid.release()
+
+    assert len(decoded) == len(frames)
+    for frame, written in zip(decoded, frames):
+        assert all(np.array_equal(frame[..., i], written) for i in range(frame.shape[-1]))
+
 def test_read(wirefree):
     """
     Test that we can read a frame!
@@ -159,6 +217,39 @@ def test_frame_count(wirefree):
             frame = wirefree.read()
 
 
+def test_read_without_mmap(wirefree, monkeypatch):
+    """
+    Files that can't be memory mapped (eg. block devices) are read from the file instead,
+    with the same results
+    """
+    # frames are views of the reader's array, so copy them to compare later
+    with wirefree:
+        expected = [wirefree.read().copy() for _ in range(3)]
+        wirefree.frame = 10
+        expected_skipped = wirefree.read().copy()
+
+    class _Unmappable(mmap.mmap):
+        def __new__(cls, *args, **kwargs):
+            raise ValueError("mmap not supported")
+
+    monkeypatch.setattr("miniscope_io.io.mmap.mmap", _Unmappable)
+    sdcard = SDCard(drive=wirefree.drive, layout=WireFreeSDLayout)
+
+    assert sdcard.frame_count == 388
+
+    with sdcard:
+        assert not isinstance(sdcard._f, mmap.mmap)
+        for frame in expected:
+            assert np.array_equal(sdcard.read(), frame)
+        # seeking forward uses skip()
+        sdcard.frame = 10
+        assert np.array_equal(sdcard.read(), expected_skipped)
+
+        sdcard.frame = 389
+        with pytest.raises(EndOfRecordingException):
+            sdcard.read()
+
+
 def test_relative_path():
     """
     Test that we can use both relative and absolute paths in the SD card model
@@ -235,3 +326,69 @@ def test_to_img(wirefree_battery, n_frames, hash, tmp_path):
     # forcing should overwrite the file
     wirefree_battery.to_img(out_file, n_frames, force=True)
     assert mtime != os.path.getmtime(out_file)
+
+
+def test_write_video_encoder(wirefree, tmp_path):
+    """
+    Videos can be written with an FFmpeg encoder through PyAV
+    """
+    pytest.importorskip("av")
+    encoder = "h264_nvenc" if encoder_available("h264_nvenc") else "libx264"
+
+    path = tmp_path / "video.mp4"
+    wirefree.to_video(path, progress=False, encoder=encoder)
+
+    vid = cv2.VideoCapture(str(path))
+    assert int(vid.get(cv2.CAP_PROP_FRAME_WIDTH)) == wirefree.config.width
+    assert int(vid.get(cv2.CAP_PROP_FRAME_HEIGHT)) == wirefree.config.height
+    n_frames = 0
+    while vid.read()[0]:
+        n_frames += 1
+    vid.release()
+    # every frame up to the end of the recording,
+    # frame_count is updated once the last frame has been read, see test_frame_count
+    assert n_frames == wirefree.frame_count
+
+
+def test_write_video_encoder_fallback(wirefree, tmp_path):
+    """
+    If the encoder can't be opened, videos are written with opencv instead
+    """
+    assert not encoder_available("not_an_encoder")
+
+    path = tmp_path / "video.avi"
+    wirefree.to_video(path, progress=False, encoder="not_an_encoder")
+
+    vid = cv2.VideoCapture(str(path))
+    n_frames = 0
+    while vid.read()[0]:
+        n_frames += 1
+    vid.release()
+    assert n_frames == wirefree.frame_count
+
+
+@pytest.mark.parametrize("size", [1, 2**10, 5 * 2**10 + 7])
+def test_hash_file_pipelined(tmp_path, size):
+    """
+    Hashing files in pipelined chunks should give the same hash as hashlib
+    """
+    data = np.random.default_rng(0).integers(0, 256, size, dtype=np.uint8).tobytes()
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+
+    assert _hash_file_pipelined(path, chunk_size=2**10) == hashlib.sha256(data).hexdigest()
+
+
+@pytest.mark.parametrize("size,pipelined", [(2**10, False), (2**10 + 1, True)])
+def test_hash_file_pipeline_size(tmp_path, monkeypatch, size, pipelined):
+    """
+    Only files larger than ``_PIPELINE_HASH_SIZE`` should be hashed in pipelined chunks
+    """
+    monkeypatch.setattr("miniscope_io.utils._PIPELINE_HASH_SIZE", 2**10)
+    monkeypatch.setattr("miniscope_io.utils._hash_file_pipelined", lambda path: "pipelined")
+    data = bytes(size)
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+
+    expected = "pipelined" if pipelined else hashlib.sha256(data).hexdigest()
+    assert hash_file(path) == expected
@@ -25,6 +25,9 @@ def test_init_logger(capsys, tmp_path):
     )
     warn_msg = 'Both loggers should show'
     logger.warning(warn_msg)
+    # file logs are written in the background, wait for them
+    for handler in logger.handlers:
+        handler.flush()
 
     # can't test for presence of string because logger can split lines depending on size of console
     # but there should be one WARNING in stdout
@@ -37,6 +40,8 @@ def test_init_logger(capsys, tmp_path):
 
     info_msg = "Now only stdout should show"
     logger.info(info_msg)
+    for handler in logger.handlers:
+        handler.flush()
     captured = capsys.readouterr()
     assert 'INFO' in captured.out
     with open(log_file, 'r') as lfile:
@@ -44,3 +49,14 @@ def test_init_logger(capsys, tmp_path):
     assert 'INFO' not in log_str
 
 
+def test_init_logger_once(tmp_path):
+    """
+    Requesting the same logger twice should return the same logger
+    without adding another set of handlers
+    """
+    logger = init_logger(name='test_logger_once', log_dir=tmp_path)
+    n_handlers = len(logger.handlers)
+
+    logger_again = init_logger(name='test_logger_once', log_dir=tmp_path)
+    assert logger_again is logger
+    assert len(logger_again.handlers) == n_handlers
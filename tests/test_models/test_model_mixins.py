@@ -1,3 +1,5 @@
+import os
+
 import pytest
 from typing import List, Dict
 
@@ -28,3 +30,32 @@ def test_yaml_mixin(tmp_path):
 
     instance = MyModel.from_yaml(yaml_file)
     assert instance.model_dump() == data
+
+
+def test_yaml_mixin_cache(tmp_path):
+    """
+    Parsed yaml files are cached, but are read again when they change,
+    and changing a returned model doesn't change the cached data
+    """
+    class MyModel(BaseModel, YAMLMixin):
+        a_int: int
+        a_list: List[int]
+
+    yaml_file = tmp_path / 'temp.yaml'
+    with open(yaml_file, 'w') as yfile:
+        yaml.safe_dump({'a_int': 5, 'a_list': [1, 2, 3]}, yfile)
+
+    instance = MyModel.from_yaml(yaml_file)
+    instance.a_list.append(4)
+    assert MyModel.from_yaml(yaml_file).a_list == [1, 2, 3]
+
+    # rewrite the file, keeping the modification time,
+    # like an edit within the mtime resolution of eg. FAT or HFS+
+    mtime_ns = os.stat(yaml_file).st_mtime_ns
+    with open(yaml_file, 'w') as yfile:
+        yaml.safe_dump({'a_int': 10, 'a_list': [1, 2, 3, 4]}, yfile)
+    os.utime(yaml_file, ns=(mtime_ns, mtime_ns))
+
+    instance = MyModel.from_yaml(yaml_file)
+    assert instance.a_int == 10
+    assert instance.a_list == [1, 2, 3, 4]
@@ -1,13 +1,29 @@
+import filecmp
+import multiprocessing
+import os
 import pdb
+import queue
 
 import pytest
-import pandas as pd
+import numpy as np
+from bitstring import Bits
 
 from miniscope_io.stream_daq import StreamDevConfig, StreamDaq
-from miniscope_io.utils import hash_video, hash_file
+from miniscope_io.utils import hash_video
 from .conftest import DATA_DIR, CONFIG_DIR
 
 
+def csv_shape(path) -> tuple:
+    """
+    (rows, columns) of a csv with a header row, like ``pd.read_csv(path).shape``,
+    without parsing it with pandas
+    """
+    with open(path, "rb") as f:
+        header = f.readline()
+        n_rows = sum(1 for _ in f)
+    return n_rows, header.count(b",") + 1
+
+
 @pytest.fixture(params=[pytest.param(5, id="buffer-size-5"), pytest.param(10, id="buffer-size-10")])
 def default_streamdaq(set_okdev_input, request) -> StreamDaq:
 
@@ -32,9 +48,7 @@ def default_streamdaq(set_okdev_input, request) -> StreamDaq:
             "stream_daq_test_200px.yml",
             "stream_daq_test_fpga_raw_input_200px.bin",
             [
-                "f878f9c55de28a9ae6128631c09953214044f5b86504d6e5b0906084c64c644c",
-                "8a6f6dc69275ec3fbcd69d1e1f467df8503306fa0778e4b9c1d41668a7af4856",
-                "3676bc4c6900bc9ec18b8387abdbed35978ebc48408de7b1692959037bc6274d",
+                "ce8612a301cfcc0b2a06ac6b3bf2815e6cb6be5fcfb954ea2d052df1d19d4ed9",
             ],
             False,
         )
@@ -87,7 +101,8 @@ def test_binary_output(config, data, set_okdev_input, tmp_path):
 
     assert output_file.exists()
 
-    assert hash_file(data_file) == hash_file(output_file)
+    # compares sizes first, then the contents chunk by chunk, stopping at the first difference
+    assert filecmp.cmp(data_file, output_file, shallow=False)
 
 
 @pytest.mark.parametrize("write_metadata", [True, False])
@@ -100,11 +115,10 @@ def test_csv_output(tmp_path, default_streamdaq, write_metadata, caplog):
     if write_metadata:
         default_streamdaq.capture(source="fpga", metadata=output_csv, show_video=False)
 
-        df = pd.read_csv(output_csv)
         # actually not sure what we should be looking for here, for now we just check for shape
         # this should be the same as long as the test data stays the same,
         # but it's a pretty weak test.
-        assert df.shape == (910, 11)
+        assert csv_shape(output_csv) == (910, 11)
 
         # ensure there were no errors during capture
         for record in caplog.records:
@@ -137,3 +151,137 @@ def test_metadata_plotting(tmp_path, default_streamdaq):
         len(default_streamdaq._header_plotter.index)
         == default_streamdaq.config.runtime.plot.history
     )
+
+
+@pytest.mark.parametrize("width,height", [(200, 100), (100, 200)])
+def test_format_frame_shape(width, height):
+    """
+    Frames should be shaped (height, width), with each row contiguous in the buffer data
+    """
+    daqConfig = StreamDevConfig.from_yaml(CONFIG_DIR / "stream_daq_test_200px.yml")
+    daqConfig.frame_width = width
+    daqConfig.frame_height = height
+    daq_inst = StreamDaq(device_config=daqConfig)
+
+    frame_data = np.arange(width * height, dtype=np.uint8)
+    frame_buffer_queue = queue.Queue()
+    imagearray = queue.Queue()
+    frame_buffer_queue.put((frame_data, []))
+    frame_buffer_queue.put(None)
+    daq_inst._format_frame(frame_buffer_queue, imagearray)
+
+    frame, _ = imagearray.get()
+    assert frame.shape == (height, width)
+    assert np.array_equal(frame[1], frame_data[width : width * 2])
+
+
+def test_worker_affinity(tmp_path, default_streamdaq, monkeypatch):
+    """
+    Configuring ``worker_affinity`` should pin each capture process to its CPU,
+    and still capture the full recording
+    """
+    pinned = {}
+
+    def _sched_setaffinity(pid, cpus):
+        names = {p.pid: p.name for p in multiprocessing.active_children()}
+        pinned[names[pid]] = cpus
+
+    monkeypatch.setattr(os, "sched_setaffinity", _sched_setaffinity, raising=False)
+    default_streamdaq.config.runtime.worker_affinity = [2, 0, 1]
+    output_csv = tmp_path / "output.csv"
+    default_streamdaq.capture(source="fpga", metadata=output_csv, show_video=False)
+
+    assert pinned == {"_fpga_recv": {2}, "_buffer_to_frame": {0}, "_format_frame": {1}}
+    assert csv_shape(output_csv) == (910, 11)
+
+
+def test_worker_affinity_unsupported(default_streamdaq, monkeypatch, caplog):
+    """
+    On platforms without ``os.sched_setaffinity`` , processes are not pinned, with a warning
+    """
+    monkeypatch.delattr(os, "sched_setaffinity", raising=False)
+    default_streamdaq.config.runtime.worker_affinity = [0, 0, 0]
+
+    default_streamdaq._pin_workers([multiprocessing.current_process()])
+
+    assert "CPU affinity is not supported on this platform" in caplog.text
+
+
+class _FakeSerial:
+    """
+    Serial port that receives ``data`` in arrivals of the given sizes,
+    and raises once everything has been read
+    """
+
+    def __init__(self, data: bytes, arrival_sizes: list):
+        self.name = "fake"
+        self._arrivals = []
+        i = 0
+        for size in arrival_sizes:
+            self._arrivals.append(bytearray(data[i : i + size]))
+            i += size
+        self._arrivals.append(bytearray(data[i:]))
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._arrivals[0]) if self._arrivals else 0
+
+    def read(self, size: int = 1) -> bytes:
+        while self._arrivals and not self._arrivals[0]:
+            self._arrivals.pop(0)
+        if not self._arrivals:
+            raise EOFError("no more data")
+        out = bytes(self._arrivals[0][:size])
+        del self._arrivals[0][:size]
+        return out
+
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize("arrival_size", [1, 3, 5, 64, None])
+def test_uart_recv(default_streamdaq, monkeypatch, arrival_size):
+    """
+    _uart_recv should queue the same buffers as reading up to and including each preamble
+    with ``read_until`` would, discarding the first partial buffer,
+    however the data arrives
+    """
+    pre = Bits(default_streamdaq.preamble)
+    if default_streamdaq.config.reverse_header_bits:
+        pre = pre[::-1]
+    pre = pre.tobytes()
+
+    rng = np.random.default_rng(0)
+    # start partway through a buffer, with some buffers ending in part of a preamble
+    pieces = [b"\x00partial"]
+    for i in range(20):
+        payload = rng.integers(0, 256, rng.integers(1, 100), dtype=np.uint8).tobytes()
+        if i % 3 == 0:
+            payload += pre[: i % len(pre)]
+        pieces.append(payload + pre)
+    pieces.append(b"unfinished")
+    data = b"".join(pieces)
+
+    # read_until semantics: everything up to and including the next preamble
+    expected = []
+    start = 0
+    while (idx := data.find(pre, start)) != -1:
+        expected.append(data[start : idx + len(pre)])
+        start = idx + len(pre)
+    expected = expected[1:]
+    assert len(expected) == 19
+
+    if arrival_size is None:
+        arrival_sizes = list(rng.integers(1, 50, size=len(data)))
+    else:
+        arrival_sizes = [arrival_size] * (len(data) // arrival_size + 1)
+    monkeypatch.setattr(
+        "miniscope_io.stream_daq.serial.Serial", lambda **kwargs: _FakeSerial(data, arrival_sizes)
+    )
+    monkeypatch.setattr("miniscope_io.stream_daq.time.sleep", lambda seconds: None)
+
+    buffers = queue.Queue()
+    with pytest.raises(SystemExit):
+        default_streamdaq._uart_recv(buffers, "COM1", 1200)
+
+    assert [buffers.get_nowait() for _ in range(buffers.qsize())] == expected